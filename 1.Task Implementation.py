@@ -1,8 +1,10 @@
 import pandas as pd
 import ifcopenshell
 import ifcopenshell.api
+from InputCache import load_compiled, load_in_background
+from ModelIO import open_model, write_model
 
-def read_csv_tasks(file_path):
+def compile_csv_tasks(file_path):
     # Read the CSV file
     df = pd.read_csv(file_path)
     
@@ -43,6 +45,10 @@ def read_csv_tasks(file_path):
 
     return tasks
 
+def read_csv_tasks(file_path):
+    # Load the tasks dictionary from the compiled WBS cache, re-parsing the CSV only when it changed
+    return load_compiled(file_path, compile_csv_tasks, "wbs")
+
 def append_tasks_to_ifc_elements(ifc_file, tasks, schedule):
     for ifc_entity, task_list in tasks.items():
         print(f"Processing IFC entity type: {ifc_entity}")
@@ -62,12 +68,14 @@ def append_tasks_to_ifc_elements(ifc_file, tasks, schedule):
                 print(f"Task '{task['Task Name']}' assigned to element '{element.GlobalId}'")
 
 def main(csv_file_path, ifc_file_path, output_ifc_file_path):
-    # Read tasks from CSV file
-    tasks = read_csv_tasks(csv_file_path)
-    print(f"Tasks read from CSV: {tasks}")
+    # Read tasks from CSV file in the background while the IFC file is parsed
+    tasks_future = load_in_background(read_csv_tasks, csv_file_path)
     
     # Open the IFC file
-    ifc_file = ifcopenshell.open(ifc_file_path)
+    ifc_file = open_model(ifc_file_path)
+    
+    tasks = tasks_future.result()
+    print(f"Tasks read from CSV: {tasks}")
     
     # Create a work schedule
     schedule = ifcopenshell.api.run("sequence.add_work_schedule", ifc_file, name="Construction Schedule A")
@@ -77,8 +85,8 @@ def main(csv_file_path, ifc_file_path, output_ifc_file_path):
     append_tasks_to_ifc_elements(ifc_file, tasks, schedule)
     
     # Save the modified IFC file
-    ifc_file.write(output_ifc_file_path)
-    print(f"Modified IFC file saved at {output_ifc_file_path}.")
+    if write_model(ifc_file, output_ifc_file_path):
+        print(f"Modified IFC file saved at {output_ifc_file_path}.")
 
 # Example usage
 csv_file_path = r'WBS\WBS_Concrete_Building.csv'  # Ensure this path matches your CSV file location
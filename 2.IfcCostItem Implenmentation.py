@@ -1,7 +1,29 @@
 import ifcopenshell
 import pandas as pd
+import sys
+from dataclasses import dataclass, field
 import ifcopenshell.util.element
 import ifcopenshell.api
+from InputCache import load_compiled, load_in_background
+from ModelIO import open_model, write_model
+
+@dataclass(slots=True)
+class PriceMatch:
+    """A price-list row matched to one of an element's BOL codes."""
+    description: str
+    unit_of_measurement: str
+    price: float
+    bol_code: str
+
+@dataclass(slots=True)
+class ElementCostData:
+    """Quantities and BOL codes extracted for a single building element."""
+    ifc_guid: str
+    entity_id: int
+    volume: float
+    surface_area: float
+    bol_codes: dict
+    matches: list = field(default_factory=list)
 
 def open_ifc_file(ifc_file_path):
     """
@@ -11,11 +33,11 @@ def open_ifc_file(ifc_file_path):
     - ifc_file_path (str): File path to the IFC file.
 
     Returns:
-    - list: List of dictionaries containing extracted data for each building element.
+    - list: List of ElementCostData records, one for each building element.
     """
     extracted_data = []
     try:
-        ifc_file = ifcopenshell.open(ifc_file_path)
+        ifc_file = open_model(ifc_file_path)
         elements = ifc_file.by_type("IfcBuildingElement")
         
         for element in elements:
@@ -35,12 +57,13 @@ def open_ifc_file(ifc_file_path):
                     if prop_name.startswith("BOL.Code"):
                         bol_codes[prop_name] = prop_value
             
-            extracted_data.append({
-                "IfcGuid": element.GlobalId,
-                "Volume": volume,
-                "SurfaceArea": area,
-                "BolCodes": bol_codes
-            })
+            extracted_data.append(ElementCostData(
+                ifc_guid=sys.intern(element.GlobalId),
+                entity_id=element.id(),
+                volume=volume,
+                surface_area=area,
+                bol_codes=bol_codes
+            ))
             
             print(f"Volume for element #{element.id()}: {volume}")
             print(f"BOL Codes for element #{element.id()}: {bol_codes}")
@@ -51,42 +74,79 @@ def open_ifc_file(ifc_file_path):
     
     return extracted_data
 
-def search_bol_code(csv_file_path, extracted_data):
+def compile_price_list(csv_file_path):
     """
-    Search for BOL codes in a CSV file and match them with extracted data.
+    Read a price-list CSV file and compile it into a lookup table keyed by cleaned BOL code.
 
     Args:
     - csv_file_path (str): File path to the CSV file containing BOL codes.
-    - extracted_data (list): List of dictionaries containing extracted data for each building element.
 
-    Modifies:
-    - Updates each dictionary in extracted_data with matches found in the CSV file.
+    Returns:
+    - dict: Maps each stripped code to its (Description, Unit of measurement, Price) row,
+      keeping the first row for duplicated codes.
+
+    Raises:
+    - ValueError: If the CSV file has no 'Code' column.
     """
-    try:
-        df = pd.read_csv(csv_file_path, encoding="ISO-8859-1")
-        
-        if "Code" in df.columns:
-            for data in extracted_data:
-                bol_codes = data["BolCodes"]
-                data["Matches"] = []
-                for code_name, bol_code in bol_codes.items():
-                    if bol_code and bol_code.strip() in df["Code"].str.strip().values:
-                        print(f"Bol.Code value '{bol_code}' found in the CSV file.")
-                        row_index = df.index[df["Code"].str.strip() == bol_code.strip()].tolist()[0]
-                        match_info = {
-                            "Description": df.at[row_index, 'Description'],
-                            "UnitOfMeasurement": df.at[row_index, 'Unit of measurement'],
-                            "Price": df.at[row_index, 'Price / Prezzo'],
-                            "BolCode": bol_code
-                        }
-                        data["Matches"].append(match_info)
-                    else:
-                        print(f"Bol.Code value '{bol_code}' not found in the CSV file.")
-        else:
-            print("Column 'Code' not found in the CSV file.")
+    df = pd.read_csv(csv_file_path, encoding="ISO-8859-1")
+    if "Code" not in df.columns:
+        raise ValueError("Column 'Code' not found in the CSV file.")
+
+    price_list = {}
+    codes = df["Code"].str.strip()
+    for code, description, unit, price in zip(codes, df['Description'], df['Unit of measurement'], df['Price / Prezzo']):
+        if isinstance(code, str):
+            price_list.setdefault(code, (description, unit, price))
+    return price_list
+
+def load_price_list(csv_file_path):
+    """
+    Load the compiled price list, re-parsing the CSV file only when it changed.
 
+    Args:
+    - csv_file_path (str): File path to the CSV file containing BOL codes.
+
+    Returns:
+    - dict: Compiled price list as returned by compile_price_list, or None if it could not be
+      loaded (missing file, wrong encoding, no 'Code' column...). The reason is printed.
+    """
+    try:
+        return load_compiled(csv_file_path, compile_price_list, "pricelist")
     except Exception as e:
-        print(f"Error: {e}")
+        print(f"Error loading price list {csv_file_path}: {e}")
+        return None
+
+def search_bol_code(price_list, extracted_data):
+    """
+    Search for BOL codes in the compiled price list and match them with extracted data.
+
+    Args:
+    - price_list (dict): Compiled price list as returned by load_price_list.
+    - extracted_data (list): List of ElementCostData records for each building element.
+
+    Modifies:
+    - Fills the matches of each record in extracted_data with rows found in the price list.
+    """
+    if price_list is None:
+        print("No price list loaded, BOL codes were not matched.")
+        return
+
+    for data in extracted_data:
+        data.matches = []
+        for code_name, bol_code in data.bol_codes.items():
+            row = price_list.get(bol_code.strip()) if bol_code else None
+            if row is not None:
+                print(f"Bol.Code value '{bol_code}' found in the CSV file.")
+                description, unit_of_measurement, price = row
+                match_info = PriceMatch(
+                    description=description,
+                    unit_of_measurement=unit_of_measurement,
+                    price=price,
+                    bol_code=bol_code
+                )
+                data.matches.append(match_info)
+            else:
+                print(f"Bol.Code value '{bol_code}' not found in the CSV file.")
 
 def create_cost_item(ifc_file, schedule, name, identification, applied_value, unit_of_measurement, element_id):
     try:
@@ -149,14 +209,17 @@ ifc_file_path = r'C:\Users\shobh\OneDrive - Universidade do Minho\Fraunhofer\4D
 # File path to the CSV file containing BOL codes
 csv_file_path = r"C:\Users\shobh\OneDrive - Universidade do Minho\Fraunhofer\IfcCostItem Implementation\Final Test\Tasks\Pricelist.csv"
 
+# Load the price list in the background while the IFC file is parsed
+price_list_future = load_in_background(load_price_list, csv_file_path)
+
 # Call the open_ifc_file function to extract data
 extracted_data = open_ifc_file(ifc_file_path)
 
 # Open the IFC file
-ifc_file = ifcopenshell.open(ifc_file_path)
+ifc_file = open_model(ifc_file_path)
 
 # Call the search_bol_code function to search and match BOL codes
-search_bol_code(csv_file_path, extracted_data)
+search_bol_code(price_list_future.result(), extracted_data)
 
 # Create a cost schedule
 schedule = ifcopenshell.api.run("cost.add_cost_schedule", ifc_file)
@@ -166,12 +229,12 @@ ifcopenshell.api.run("cost.edit_cost_schedule", ifc_file, cost_schedule=schedule
 
 # Assuming extracted_data contains the required information
 for data in extracted_data:
-    for match in data.get("Matches", []):
-        bol_code = match["BolCode"]
-        description = match["Description"]
-        price = match["Price"]
-        unit_of_measurement = match["UnitOfMeasurement"]
-        element_id = data["IfcGuid"]
+    for match in data.matches:
+        bol_code = match.bol_code
+        description = match.description
+        price = match.price
+        unit_of_measurement = match.unit_of_measurement
+        element_id = data.ifc_guid
 
         # Create cost item with description as name and bol_code as identification
         create_cost_item(ifc_file, schedule, name=description, identification=bol_code, applied_value=price, unit_of_measurement=unit_of_measurement, element_id=element_id)
@@ -179,4 +242,4 @@ print("Cost items created successfully.")
 
 # Optionally, you can print or further process extracted_data or the created cost items.
 print(extracted_data)
-ifc_file.write(r"C:\Users\shobh\OneDrive - Universidade do Minho\Fraunhofer\4D Using IFC SCHEMA\Model\Test_1_Task+cost.ifc")
\ No newline at end of file
+write_model(ifc_file, r"C:\Users\shobh\OneDrive - Universidade do Minho\Fraunhofer\4D Using IFC SCHEMA\Model\Test_1_Task+cost.ifc")
\ No newline at end of file
@@ -1,10 +1,11 @@
 import ifcopenshell
 import ifcopenshell.util.cost
 import ifcopenshell.util.sequence
+from ModelIO import open_model, write_model
 
 # Load the IFC file
 file_path = r'C:\Users\shobh\OneDrive - Universidade do Minho\Fraunhofer\4D Using IFC SCHEMA\Model\Test_1_Task+cost.ifc'
-ifc_file = ifcopenshell.open(file_path)
+ifc_file = open_model(file_path)
 
 # Function to retrieve cost items and referenced tasks for all building elements
 def get_cost_items_and_referenced_tasks_for_all_building_elements(ifc_file):
@@ -84,6 +85,5 @@ get_cost_items_and_referenced_tasks_for_all_building_elements(ifc_file)
 
 # Save the modified IFC file
 output_file_path = r'C:\Users\shobh\OneDrive - Universidade do Minho\Fraunhofer\4D Using IFC SCHEMA\Model\Test_1_Task+cost_linked.ifc'
-ifc_file.write(output_file_path)
-
-print(f"Modified IFC file saved to {output_file_path}")
+if write_model(ifc_file, output_file_path):
+    print(f"Modified IFC file saved to {output_file_path}")
@@ -1,26 +1,78 @@
-import ifcopenshell
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import ifcopenshell.util.sequence
+from WorkCalendar import site_calendar
+from ModelIO import open_model, write_model
 
-def update_ifc_with_actuals_and_compute_completion(ifc_file_path, csv_file_path):
-    # Load the existing IFC file
-    ifc_file = ifcopenshell.open(ifc_file_path)
-    
+def parse_date(date_str):
+    # Parse a single date as ISO 8601, falling back to 'dd-mm-YYYY HH:MM'. Unparseable dates give NaT.
+    try:
+        return pd.Timestamp(datetime.fromisoformat(date_str))
+    except ValueError:
+        return pd.to_datetime(date_str, format='%d-%m-%Y %H:%M', errors='coerce')
+
+def to_local_naive(timestamp):
+    # Dates with a UTC offset are converted to naive local time, the same clock as datetime.now()
+    if pd.isna(timestamp) or timestamp.tzinfo is None:
+        return timestamp
+    return pd.Timestamp(timestamp.to_pydatetime().astimezone().replace(tzinfo=None))
+
+def parse_dates(df, column):
+    # Parse a date column as ISO 8601, falling back to 'dd-mm-YYYY HH:MM'. Missing columns give NaT.
+    if column not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    values = df[column].astype(str).where(df[column].notna())
+    try:
+        parsed = pd.to_datetime(values, format='ISO8601', errors='coerce')
+        fallback = pd.to_datetime(values, format='%d-%m-%Y %H:%M', errors='coerce')
+        parsed = parsed.fillna(fallback)
+    except (ValueError, TypeError):
+        # Mixed UTC offsets cannot share one datetime column
+        parsed = None
+    if parsed is not None and pd.api.types.is_datetime64_any_dtype(parsed) and parsed.dt.tz is None:
+        return parsed
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        # Offset dates mixed with other offsets or with naive dates, parse row by row
+        parsed = values.map(parse_date, na_action='ignore')
+    return pd.to_datetime(parsed.map(to_local_naive, na_action='ignore'))
+
+def read_actuals_csv(csv_file_path):
     try:
         # Read updated CSV file with specified encoding
         updated_df = pd.read_csv(csv_file_path, encoding='latin-1')  # or encoding='cp1252' if latin-1 doesn't work
     except pd.errors.ParserError as e:
         print(f"ParserError: {e}")
-        return
+        return None
 
     # Print column names to ensure correct identification
     print("Columns in CSV:", updated_df.columns.tolist())
-    
+    return updated_df
+
+def apply_actuals_and_compute_completion(ifc_file, updated_df):
+    # Update the tasks of an open IFC file with the actuals in updated_df and return the completion rows
     completion_data = []
     
+    # Parse all dates and compute working-time durations for every row at once
+    actual_starts = parse_dates(updated_df, 'ActualStart')
+    actual_finishes = parse_dates(updated_df, 'ActualFinish')
+    schedule_starts = parse_dates(updated_df, 'ScheduleStart')
+    schedule_finishes = parse_dates(updated_df, 'ScheduleFinish')
+    
+    # Unfinished tasks are measured up to now
+    is_finished = actual_finishes.notna().to_numpy()
+    progress_until = np.where(is_finished, actual_finishes.to_numpy(), np.datetime64(datetime.now(), 'ns'))
+    actual_hours = site_calendar.working_hours_between(actual_starts.to_numpy(), progress_until)
+    schedule_hours = site_calendar.working_hours_between(schedule_starts.to_numpy(), schedule_finishes.to_numpy())
+    actual_days = actual_hours / site_calendar.hours_per_day
+    schedule_days = np.nan_to_num(schedule_hours / site_calendar.hours_per_day)
+    
+    # Finished tasks are complete, others progress by working time spent over working time scheduled
+    with np.errstate(divide='ignore', invalid='ignore'):
+        completion_percentages = np.where(is_finished, 100, np.where(schedule_hours > 0, actual_hours / schedule_hours * 100, 0))
+    
     # Update IFC file with actual start and finish dates and compute completion
-    for index, row in updated_df.iterrows():
+    for position, (index, row) in enumerate(updated_df.iterrows()):
         # Check if 'Element_GlobalId' and 'Task_Id' columns are NaN or missing
         if pd.isna(row['Element_GlobalId']) or pd.isna(row['Task_Id']):
             print(f"Skipping row {index} due to NaN values.")
@@ -44,52 +96,22 @@ def update_ifc_with_actuals_and_compute_completion(ifc_file_path, csv_file_path)
             print(f"Task with GUID {task_guid} not found.")
             continue
         
-        # Parse dates
-        def parse_date(date_str):
-            try:
-                return datetime.fromisoformat(date_str)
-            except ValueError:
-                return pd.to_datetime(date_str, format='%d-%m-%Y %H:%M')
-        
         # Update actual start and finish dates in the IFC file
-        if 'ActualStart' in row and pd.notna(row['ActualStart']):
-            actual_start = parse_date(row['ActualStart'])
+        actual_start = actual_starts.iat[position]
+        actual_finish = actual_finishes.iat[position]
+        if pd.notna(actual_start):
             task.TaskTime.ActualStart = actual_start.isoformat()
-        if 'ActualFinish' in row and pd.notna(row['ActualFinish']):
-            actual_finish = parse_date(row['ActualFinish'])
+        if pd.notna(actual_finish):
             task.TaskTime.ActualFinish = actual_finish.isoformat()
         
-        # Initialize Schedule_duration to avoid UnboundLocalError
-        Schedule_duration = 0
-        
-        # Calculate and update actual duration if both actual start and finish are present
-        if 'ActualStart' in row and pd.notna(row['ActualStart']):
-            actual_start = parse_date(row['ActualStart'])
+        # Durations and completion only apply once the task has started
+        if pd.notna(actual_start):
+            actual_duration = round(float(actual_days[position]), 2)
+            completion_percentage = float(completion_percentages[position])
             
-            if 'ActualFinish' in row and pd.notna(row['ActualFinish']):
-                actual_finish = parse_date(row['ActualFinish'])
-                actual_duration = (actual_finish - actual_start).days
-                
-                # Update actual duration in the IFC file
-                task.TaskTime.ActualDuration = f"P{actual_duration}D"
-                
-                # Set completion percentage to 100% as the task is completed
-                completion_percentage = 100
-            else:
-                current_date = datetime.now()
-                actual_duration = (current_date - actual_start).days
-                
-                # Calculate Schedule duration
-                if 'ScheduleStart' in row and pd.notna(row['ScheduleStart']) and 'ScheduleFinish' in row and pd.notna(row['ScheduleFinish']):
-                    Schedule_start = parse_date(row['ScheduleStart'])
-                    Schedule_finish = parse_date(row['ScheduleFinish'])
-                    Schedule_duration = (Schedule_finish - Schedule_start).days
-                
-                # Calculate completion percentage
-                if Schedule_duration > 0:
-                    completion_percentage = (actual_duration / Schedule_duration) * 100
-                else:
-                    completion_percentage = 0
+            # Update actual duration in the IFC file, in working hours
+            if is_finished[position]:
+                task.TaskTime.ActualDuration = f"PT{int(round(actual_hours[position]))}H"
             
             # Update completion in the IFC file
             task.TaskTime.Completion = completion_percentage
@@ -97,15 +119,27 @@ def update_ifc_with_actuals_and_compute_completion(ifc_file_path, csv_file_path)
             completion_data.append({
                 'Element_GlobalId': row['Element_GlobalId'],
                 'Task_Id': row['Task_Id'],
-                'ScheduleDuration': Schedule_duration,
+                'ScheduleDuration': round(float(schedule_days[position]), 2),
                 'ActualDuration': actual_duration,
                 'CompletionPercentage': completion_percentage
             })
     
+    return completion_data
+
+def update_ifc_with_actuals_and_compute_completion(ifc_file_path, csv_file_path):
+    # Load the existing IFC file
+    ifc_file = open_model(ifc_file_path)
+    
+    updated_df = read_actuals_csv(csv_file_path)
+    if updated_df is None:
+        return
+    
+    completion_data = apply_actuals_and_compute_completion(ifc_file, updated_df)
+    
     # Save updated IFC file
     updated_ifc_file_path = 'updated_ifc_file.ifc'
-    ifc_file.write(updated_ifc_file_path)
-    print(f"Updated IFC file saved: {updated_ifc_file_path}")
+    if write_model(ifc_file, updated_ifc_file_path):
+        print(f"Updated IFC file saved: {updated_ifc_file_path}")
     
     # Save completion data to a new CSV file
     completion_df = pd.DataFrame(completion_data)
@@ -1,10 +1,10 @@
 import ifcopenshell
 import pandas as pd
+import sys
+from array import array
 import ifcopenshell.util.sequence
 import ifcopenshell.util.cost
-
-# Load the existing IFC file
-ifc_file = ifcopenshell.open(r'Model\Test_1_Task+cost_linked_with_tasktime.ifc')
+from ModelIO import open_model
 
 # Function to safely extract values
 def get_wrapped_value(attr):
@@ -20,9 +20,66 @@ def get_cost_items_linked_to_task(ifc_file, task):
                     cost_items.append(related_object)
     return cost_items
 
-# Function to collect elements with referenced tasks, task times, cost items, and quantities into a list of dictionaries
-def collect_element_task_data(ifc_file):
-    data = []
+# Function to index the cost items linked to every task in a single pass, keyed by task id
+def index_cost_items_by_task(ifc_file):
+    cost_items_by_task = {}
+    for rel in ifc_file.by_type("IfcRelAssignsToProcess"):
+        cost_items = cost_items_by_task.setdefault(rel.RelatingProcess.id(), [])
+        for related_object in rel.RelatedObjects:
+            if related_object.is_a("IfcCostItem"):
+                cost_items.append(related_object)
+    return cost_items_by_task
+
+# Column-oriented table of element/task/cost rows. Strings are interned and numbers
+# are kept in typed arrays instead of one dictionary per row. As with a DataFrame built
+# from row dictionaries, a numeric column stays integer while every value in it is an int.
+class ElementTaskTable:
+    __slots__ = ('element', 'task', 'task_id', 'quantity_type', 'quantity_value', 'total_cost',
+                 'quantity_value_is_int', 'total_cost_is_int')
+
+    def __init__(self):
+        self.element = []
+        self.task = []
+        self.task_id = []
+        self.quantity_type = []
+        self.quantity_value = array('d')
+        self.total_cost = array('d')
+        self.quantity_value_is_int = True
+        self.total_cost_is_int = True
+
+    def __len__(self):
+        return len(self.element)
+
+    def append(self, element_guid, task_name, task_guid, quantity_type, quantity_value, total_cost):
+        self.element.append(sys.intern(element_guid))
+        self.task.append(sys.intern(f"{task_name}"))
+        self.task_id.append(sys.intern(task_guid))
+        self.quantity_type.append(quantity_type)
+        # A missing quantity is stored as NaN, which pandas treats the same as None
+        self.quantity_value.append(float('nan') if quantity_value is None else quantity_value)
+        self.total_cost.append(total_cost)
+        self.quantity_value_is_int = self.quantity_value_is_int and type(quantity_value) is int
+        self.total_cost_is_int = self.total_cost_is_int and type(total_cost) is int
+
+    def to_dataframe(self):
+        df = pd.DataFrame({
+            'Element': self.element,
+            'Task': self.task,
+            'TaskID': self.task_id,
+            'QuantityType': self.quantity_type,
+            'QuantityValue': self.quantity_value,
+            'TotalCost': self.total_cost
+        })
+        if self.quantity_value_is_int:
+            df['QuantityValue'] = df['QuantityValue'].astype('int64')
+        if self.total_cost_is_int:
+            df['TotalCost'] = df['TotalCost'].astype('int64')
+        return df
+
+# Function to collect elements with referenced tasks, task times, cost items, and quantities into a columnar table
+# Pass cost_items_by_task from index_cost_items_by_task to avoid rescanning the relationships for every task
+def collect_element_task_data(ifc_file, cost_items_by_task=None):
+    data = ElementTaskTable()
     elements = ifc_file.by_type("IfcElement")
     
     for element in elements:
@@ -30,18 +87,13 @@ def collect_element_task_data(ifc_file):
         
         for idx, task in enumerate(referenced_tasks):
             task_time = task.TaskTime
-            cost_items = get_cost_items_linked_to_task(ifc_file, task)
+            if cost_items_by_task is None:
+                cost_items = get_cost_items_linked_to_task(ifc_file, task)
+            else:
+                cost_items = cost_items_by_task.get(task.id(), [])
             
             if not cost_items:
-                element_data = {
-                    'Element': f"{element.GlobalId}",
-                    'Task': f"{task.Name}",
-                    'TaskID': f"{task.GlobalId}",
-                    'QuantityType': None,
-                    'QuantityValue': 0,
-                    'TotalCost': 0
-                }
-                data.append(element_data)
+                data.append(element.GlobalId, task.Name, task.GlobalId, None, 0, 0)
             else:
                 for cost_item in cost_items:
                     total_cost = 0
@@ -62,29 +114,25 @@ def collect_element_task_data(ifc_file):
                                     cost_value = related_cost_value.AppliedValue.wrappedValue
                                     total_cost += quantity_value * cost_value
 
-                        element_data = {
-                            'Element': f"{element.GlobalId}",
-                            'Task': f"{task.Name}",
-                            'TaskID': f"{task.GlobalId}",
-                            'QuantityType': quantity_type,
-                            'QuantityValue': quantity_value,
-                            'TotalCost': total_cost
-                        }
-                        data.append(element_data)
+                        data.append(element.GlobalId, task.Name, task.GlobalId, quantity_type, quantity_value, total_cost)
     
     return data
 
-# Collect data into a list of dictionaries
-element_task_data = collect_element_task_data(ifc_file)
+if __name__ == "__main__":
+    # Load the existing IFC file
+    ifc_file = open_model(r'Model\Test_1_Task+cost_linked_with_tasktime.ifc')
+    
+    # Collect data into a columnar table
+    element_task_data = collect_element_task_data(ifc_file, index_cost_items_by_task(ifc_file))
 
-# Convert to DataFrame
-df = pd.DataFrame(element_task_data)
+    # Convert to DataFrame
+    df = element_task_data.to_dataframe()
 
-# Print the DataFrame (optional, for verification)
-print(df)
+    # Print the DataFrame (optional, for verification)
+    print(df)
 
-# Save DataFrame to CSV (optional)
-df.to_csv('costdata.csv', index=False)
+    # Save DataFrame to CSV (optional)
+    df.to_csv('costdata.csv', index=False)
 
-# Output message when done
-print("Finished processing tasks and their linked cost items.")
+    # Output message when done
+    print("Finished processing tasks and their linked cost items.")
@@ -0,0 +1,103 @@
+import os
+import pickle
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Bump when the layout of a compiled cache changes so old caches get rebuilt
+CACHE_FORMAT_VERSION = 1
+
+def file_sha256(file_path):
+    """
+    Compute the SHA-256 hash of a file, reading it in chunks.
+
+    Args:
+    - file_path (str): File path to hash.
+
+    Returns:
+    - str: Hex digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_compiled(source_path, compile_fn, kind):
+    """
+    Load the compiled form of a source file, rebuilding it only when the source changed.
+
+    The compiled data is pickled next to the source file. The cache is reused as is when
+    the source mtime and size match; if only the mtime changed (e.g. after a OneDrive sync)
+    the content hash decides whether it is still valid.
+
+    Args:
+    - source_path (str): File path to the source CSV file.
+    - compile_fn (callable): Function taking source_path and returning the compiled data.
+    - kind (str): Name of the compiled form, stored in the cache to avoid mixing formats.
+
+    Returns:
+    - object: The compiled data returned by compile_fn.
+    """
+    cache_path = f"{source_path}.{kind}.cache.pkl"
+    stat = os.stat(source_path)
+
+    cached = None
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except Exception:
+        # Missing, corrupt or foreign cache files are rebuilt from the source
+        cached = None
+
+    if isinstance(cached, dict) and cached.get("version") == CACHE_FORMAT_VERSION and cached.get("kind") == kind:
+        if cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            print(f"Loaded compiled {kind} from cache: {cache_path}")
+            return cached["data"]
+        source_hash = file_sha256(source_path)
+        if cached["sha256"] == source_hash:
+            # Contents unchanged, only refresh the recorded mtime
+            cached["mtime"] = stat.st_mtime_ns
+            cached["size"] = stat.st_size
+            write_cache(cache_path, cached)
+            print(f"Loaded compiled {kind} from cache (mtime refreshed): {cache_path}")
+            return cached["data"]
+    else:
+        source_hash = file_sha256(source_path)
+
+    data = compile_fn(source_path)
+    write_cache(cache_path, {
+        "version": CACHE_FORMAT_VERSION,
+        "kind": kind,
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": source_hash,
+        "data": data
+    })
+    print(f"Compiled {kind} cache written: {cache_path}")
+    return data
+
+def write_cache(cache_path, cached):
+    # Write to a temporary file first so an interrupted run never leaves a truncated cache
+    temp_path = f"{cache_path}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write cache {cache_path}: {e}")
+
+def load_in_background(fn, *args, **kwargs):
+    """
+    Run a loading function on a background thread, e.g. while ifcopenshell.open parses a model.
+
+    Args:
+    - fn (callable): Function to run.
+    - *args, **kwargs: Arguments passed to fn.
+
+    Returns:
+    - concurrent.futures.Future: Call .result() to wait for and get the loaded data.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(fn, *args, **kwargs)
+    executor.shutdown(wait=False)
+    return future
@@ -0,0 +1,179 @@
+import os
+import gzip
+import shutil
+import hashlib
+import zipfile
+import tempfile
+from contextlib import contextmanager
+import ifcopenshell
+
+# Models are hashed, compressed and decompressed in chunks of this size
+CHUNK_SIZE = 1024 * 1024
+
+DATA_MARKER = b"DATA;"
+
+def model_format(file_path):
+    # Storage format from the file extension: .ifczip (zip archive), .gz (gzip) or plain STEP
+    lower_path = file_path.lower()
+    if lower_path.endswith(".ifczip"):
+        return "ifczip"
+    if lower_path.endswith(".gz"):
+        return "gzip"
+    return "ifc"
+
+@contextmanager
+def open_step_stream(file_path):
+    """
+    Open the STEP contents of a plain, gzip or .ifczip model file as a binary stream.
+
+    Args:
+    - file_path (str): File path to the model.
+
+    Yields:
+    - file object: Readable binary stream of the uncompressed STEP contents.
+    """
+    file_format = model_format(file_path)
+    if file_format == "ifczip":
+        with zipfile.ZipFile(file_path) as archive:
+            members = [name for name in archive.namelist() if name.lower().endswith(".ifc")]
+            if not members:
+                raise ValueError(f"No .ifc file found in {file_path}")
+            with archive.open(members[0]) as f:
+                yield f
+    elif file_format == "gzip":
+        with gzip.open(file_path, "rb") as f:
+            yield f
+    else:
+        with open(file_path, "rb") as f:
+            yield f
+
+def open_model(file_path):
+    """
+    Open a plain, gzip or .ifczip IFC model.
+
+    Compressed models are decompressed in chunks to a temporary STEP file, which is then
+    parsed by ifcopenshell.open, so the uncompressed model is never held in memory as text.
+
+    Args:
+    - file_path (str): File path to the model.
+
+    Returns:
+    - ifcopenshell.file: The opened model.
+    """
+    if model_format(file_path) == "ifc":
+        return ifcopenshell.open(file_path)
+
+    temp_file = tempfile.NamedTemporaryFile(suffix=".ifc", delete=False)
+    try:
+        with temp_file, open_step_stream(file_path) as f:
+            shutil.copyfileobj(f, temp_file, CHUNK_SIZE)
+        return ifcopenshell.open(temp_file.name)
+    finally:
+        os.remove(temp_file.name)
+
+def content_hash(f):
+    """
+    Hash the DATA section of a STEP stream chunk by chunk, so header timestamps do not count as changes.
+
+    Args:
+    - f (file object): Readable binary stream of STEP contents.
+
+    Returns:
+    - str: Hex digest of the contents from 'DATA;' on, or of the whole stream if it has no DATA section.
+    """
+    data_digest = hashlib.sha256()
+    whole_digest = hashlib.sha256()
+    found = False
+    # The end of the previous chunk, in case the marker is split across two chunks
+    carry = b""
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+        whole_digest.update(chunk)
+        if found:
+            data_digest.update(chunk)
+            continue
+        searched = carry + chunk
+        data_start = searched.find(DATA_MARKER)
+        if data_start >= 0:
+            data_digest.update(searched[data_start:])
+            found = True
+        else:
+            carry = searched[-(len(DATA_MARKER) - 1):]
+    return (data_digest if found else whole_digest).hexdigest()
+
+def stored_content_hash(file_path):
+    # Content hash of an existing model file, from its sidecar when the file is unchanged since it was written
+    hash_path = f"{file_path}.sha256"
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    try:
+        with open(hash_path) as f:
+            stored_hash, size, mtime = f.read().split()
+        if int(size) == stat.st_size and int(mtime) == stat.st_mtime_ns:
+            return stored_hash
+    except (OSError, ValueError):
+        pass
+    with open_step_stream(file_path) as f:
+        existing_hash = content_hash(f)
+    write_hash_sidecar(file_path, existing_hash)
+    return existing_hash
+
+def write_hash_sidecar(file_path, step_hash):
+    stat = os.stat(file_path)
+    with open(f"{file_path}.sha256", "w") as f:
+        f.write(f"{step_hash} {stat.st_size} {stat.st_mtime_ns}\n")
+
+def write_model(ifc_file, file_path, force=False):
+    """
+    Write an IFC model, compressed according to the file extension, only if its contents changed.
+
+    The model is written by ifcopenshell to a plain STEP file in the system temporary directory
+    (not the target folder, which may be synced) and hashed in chunks. Only if it changed is it
+    copied in chunks, through the compressor for .ifczip and .gz targets, into a temporary file
+    next to the target and moved into place, so readers and sync clients never see a partially
+    written model. A .sha256 sidecar records the content hash so unchanged models are skipped
+    without re-reading the target.
+
+    Args:
+    - ifc_file (ifcopenshell.file): The model to write.
+    - file_path (str): Target path ending in .ifc, .ifczip or .gz (e.g. .ifc.gz).
+    - force (bool): Write even if the target already holds the same contents.
+
+    Returns:
+    - bool: True if the file was written, False if the write was skipped.
+    """
+    directory, file_name = os.path.split(os.path.abspath(file_path))
+    step_fd, step_temp_path = tempfile.mkstemp(suffix=".ifc")
+    os.close(step_fd)
+    staged_path = os.path.join(directory, f".{file_name}.tmp")
+    file_format = model_format(file_path)
+    try:
+        ifc_file.write(step_temp_path)
+        with open(step_temp_path, "rb") as f:
+            new_hash = content_hash(f)
+
+        if not force and stored_content_hash(file_path) == new_hash:
+            print(f"Model unchanged, skipped writing {file_path}")
+            return False
+
+        with open(step_temp_path, "rb") as source, open(staged_path, "wb") as raw:
+            if file_format == "ifczip":
+                member_name = os.path.splitext(file_name)[0] + ".ifc"
+                with zipfile.ZipFile(raw, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                    with archive.open(member_name, "w", force_zip64=True) as f:
+                        shutil.copyfileobj(source, f, CHUNK_SIZE)
+            elif file_format == "gzip":
+                # mtime=0 keeps the output identical for identical models
+                with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                    shutil.copyfileobj(source, f, CHUNK_SIZE)
+            else:
+                shutil.copyfileobj(source, raw, CHUNK_SIZE)
+        os.replace(staged_path, file_path)
+    finally:
+        for temp_path in (step_temp_path, staged_path):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    write_hash_sidecar(file_path, new_hash)
+    return True
@@ -0,0 +1,247 @@
+import os
+import io
+import json
+import time
+import argparse
+import threading
+import importlib.util
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+from ModelIO import open_model, write_model
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(file_name, module_name):
+    # The numbered pipeline scripts are not importable by name, so load them from their file path
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+update_actuals = load_script("5.UpdateActuals.py", "update_actuals")
+export_schedule = load_script("6.ExportScheduleFinal.py", "export_schedule")
+
+def json_records(df):
+    # DataFrame rows as JSON-safe dictionaries, with NaN written as null
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+class ScheduleService:
+    """
+    Keeps a linked IFC model and its task/cost indexes in memory between requests.
+
+    Actuals are applied to the loaded model with the same logic as 5.UpdateActuals.py and
+    the model is only written back to disk when flushed.
+
+    Args:
+    - ifc_file_path (str): File path to the IFC file with tasks, task times and linked costs.
+    - output_ifc_file_path (str): File path the updated IFC file is flushed to.
+    - watch_dir (str): Directory polled for actuals CSV drops, or None to disable it.
+    """
+
+    def __init__(self, ifc_file_path, output_ifc_file_path, watch_dir=None):
+        self.output_ifc_file_path = output_ifc_file_path
+        self.watch_dir = watch_dir
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.last_flush = time.monotonic()
+
+        started = time.monotonic()
+        self.ifc_file = open_model(ifc_file_path)
+        self.build_indexes()
+        print(f"Loaded {ifc_file_path} with {len(self.tasks_by_guid)} tasks in {time.monotonic() - started:.1f} s")
+
+    def build_indexes(self):
+        # Costs do not change when actuals are applied, so the cost table is built once
+        with self.lock:
+            self.tasks_by_guid = {task.GlobalId: task for task in self.ifc_file.by_type("IfcTask")}
+            self.cost_items_by_task = export_schedule.index_cost_items_by_task(self.ifc_file)
+            self.cost_df = export_schedule.collect_element_task_data(self.ifc_file, self.cost_items_by_task).to_dataframe()
+
+    def apply_actuals(self, updated_df):
+        with self.lock:
+            # Mark the model dirty first: a failed apply may already have changed some tasks
+            self.dirty = True
+            return update_actuals.apply_actuals_and_compute_completion(self.ifc_file, updated_df)
+
+    def apply_actuals_csv(self, csv_file_path):
+        updated_df = update_actuals.read_actuals_csv(csv_file_path)
+        if updated_df is None:
+            return None
+        return self.apply_actuals(updated_df)
+
+    def find_tasks(self, task_guid=None):
+        if task_guid is None:
+            return list(self.tasks_by_guid.values())
+        task = self.tasks_by_guid.get(task_guid)
+        return [task] if task else []
+
+    def task_time_row(self, task):
+        task_time = task.TaskTime
+        row = {'Task_Id': task.GlobalId, 'Task_Name': task.Name}
+        for attribute in ('ScheduleStart', 'ScheduleFinish', 'ScheduleDuration',
+                          'ActualStart', 'ActualFinish', 'ActualDuration', 'Completion'):
+            row[attribute] = getattr(task_time, attribute) if task_time else None
+        return row
+
+    def schedule(self, task_guid=None):
+        with self.lock:
+            return [self.task_time_row(task) for task in self.find_tasks(task_guid)]
+
+    def completion(self, task_guid=None):
+        with self.lock:
+            rows = []
+            for task in self.find_tasks(task_guid):
+                row = self.task_time_row(task)
+                rows.append({key: row[key] for key in ('Task_Id', 'Task_Name', 'ActualStart', 'ActualFinish', 'Completion')})
+            return rows
+
+    def cost(self, task_guid=None, element_guid=None):
+        with self.lock:
+            df = self.cost_df
+            if task_guid is not None:
+                df = df[df['TaskID'] == task_guid]
+            if element_guid is not None:
+                df = df[df['Element'] == element_guid]
+            return {'TotalCost': float(df['TotalCost'].sum()), 'Rows': json_records(df)}
+
+    def flush(self):
+        # Write the model only if actuals were applied since the last flush
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if not self.dirty:
+                return False
+            written = write_model(self.ifc_file, self.output_ifc_file_path)
+            self.dirty = False
+        if written:
+            print(f"Updated IFC file saved: {self.output_ifc_file_path}")
+        return written
+
+    def scan_watch_dir(self, settle_seconds=2):
+        # Apply each CSV dropped in the watch directory once, then move it to a 'processed' subdirectory,
+        # or to 'failed' if it could not be read or applied so it does not block later drops.
+        # Files modified in the last few seconds may still be copying or syncing and are left for the next scan.
+        if not self.watch_dir:
+            return
+        csv_files = [entry for entry in os.scandir(self.watch_dir) if entry.is_file() and entry.name.lower().endswith(".csv")]
+        for entry in sorted(csv_files, key=lambda entry: entry.stat().st_mtime):
+            if time.time() - entry.stat().st_mtime < settle_seconds:
+                continue
+            print(f"Applying actuals from {entry.path}")
+            try:
+                completion_data = self.apply_actuals_csv(entry.path)
+            except Exception as e:
+                print(f"Error applying actuals from {entry.name}: {e}")
+                completion_data = None
+            if completion_data is not None:
+                print(f"Applied {len(completion_data)} actuals rows from {entry.name}")
+                target_dir = os.path.join(self.watch_dir, "processed")
+            else:
+                target_dir = os.path.join(self.watch_dir, "failed")
+            os.makedirs(target_dir, exist_ok=True)
+            os.replace(entry.path, os.path.join(target_dir, entry.name))
+
+    def run_background(self, stop_event, poll_interval=5, flush_interval=300):
+        # Poll the watch directory and flush periodically until stop_event is set
+        while not stop_event.wait(poll_interval):
+            try:
+                self.scan_watch_dir()
+                if time.monotonic() - self.last_flush >= flush_interval:
+                    self.flush()
+            except Exception as e:
+                print(f"Error: {e}")
+
+class ScheduleRequestHandler(BaseHTTPRequestHandler):
+    # GET /schedule, /completion and /cost (optional ?task= and ?element= GUID filters),
+    # POST /actuals with a CSV body and POST /flush
+    service = None
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/schedule":
+                self.send_json(self.service.schedule(query.get("task")))
+            elif url.path == "/completion":
+                self.send_json(self.service.completion(query.get("task")))
+            elif url.path == "/cost":
+                self.send_json(self.service.cost(query.get("task"), query.get("element")))
+            elif url.path == "/status":
+                self.send_json({'Tasks': len(self.service.tasks_by_guid), 'Unsaved': self.service.dirty})
+            else:
+                self.send_json({'Error': f"Unknown path {url.path}"}, status=404)
+        except Exception as e:
+            self.send_json({'Error': str(e)}, status=500)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/actuals":
+                length = int(self.headers.get("Content-Length", 0))
+                csv_text = self.rfile.read(length).decode("latin-1")
+                updated_df = pd.read_csv(io.StringIO(csv_text))
+                self.send_json(self.service.apply_actuals(updated_df))
+            elif url.path == "/flush":
+                self.send_json({'Written': self.service.flush()})
+            else:
+                self.send_json({'Error': f"Unknown path {url.path}"}, status=404)
+        except pd.errors.ParserError as e:
+            self.send_json({'Error': f"ParserError: {e}"}, status=400)
+        except Exception as e:
+            self.send_json({'Error': str(e)}, status=500)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def create_server(service, host="127.0.0.1", port=8765, socket_path=None):
+    handler = type("BoundScheduleRequestHandler", (ScheduleRequestHandler,), {"service": service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve schedule, cost and completion queries from an IFC model held in memory.")
+    parser.add_argument("ifc_file_path", help="IFC file with tasks, task times and linked cost items")
+    parser.add_argument("--output", default="updated_ifc_file.ifc", help="IFC file the updated model is flushed to")
+    parser.add_argument("--watch-dir", help="Directory polled for actuals CSV drops")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="Serve on this Unix socket path instead of TCP")
+    parser.add_argument("--poll-interval", type=float, default=5, help="Seconds between watch directory scans")
+    parser.add_argument("--flush-interval", type=float, default=300, help="Seconds between automatic flushes")
+    args = parser.parse_args()
+
+    service = ScheduleService(args.ifc_file_path, args.output, args.watch_dir)
+    stop_event = threading.Event()
+    background = threading.Thread(target=service.run_background, args=(stop_event, args.poll_interval, args.flush_interval), daemon=True)
+    background.start()
+
+    server = create_server(service, args.host, args.port, args.socket)
+    print(f"Schedule service listening on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        background.join()
+        server.server_close()
+        service.flush()
+
+if __name__ == "__main__":
+    main()
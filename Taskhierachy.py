@@ -1,8 +1,13 @@
 import ifcopenshell
 import ifcopenshell.util.sequence
 import pandas as pd
+import numpy as np
 import datetime
+import sys
+from dataclasses import dataclass
 import ifcopenshell.api
+from WorkCalendar import site_calendar, to_iso_strings
+from ModelIO import open_model, write_model
 
 # Adjusted productivity rates (units/hour)
 productivity_rates = {
@@ -67,6 +72,38 @@ def calculate_task_time(task, cost_items):
                 total_hours += quantity.WeightValue / productivity_rates.get("Rebar Installation", 20)
     return total_hours
 
+@dataclass(slots=True)
+class StoryEntity:
+    # One row per (element, task) pair. Entities are kept as integer step ids
+    # and interned GUIDs rather than live entity handles so large models stay small.
+    story_index: int
+    story_elevation: float
+    entity_id: int
+    entity_guid: str
+    task_id: int
+    bottom_elevation: float
+    top_elevation: float
+    sequence_order: int
+    cost_item_ids: tuple
+    estimated_task_time: float = 0.0
+    schedule_start: str = None
+    schedule_finish: str = None
+    schedule_duration: str = None
+
+def sort_story_entities(story_entities):
+    # Sort by story elevation, then by (BottomElevation, SequenceOrder) within each story.
+    # np.lexsort treats the last key as the primary one and is stable, and the story index
+    # keeps stories with equal elevations in their original order.
+    count = len(story_entities)
+    if not count:
+        return story_entities
+    sequence_orders = np.fromiter((e.sequence_order for e in story_entities), dtype=np.int32, count=count)
+    bottom_elevations = np.fromiter((e.bottom_elevation for e in story_entities), dtype=np.float64, count=count)
+    story_indices = np.fromiter((e.story_index for e in story_entities), dtype=np.int32, count=count)
+    story_elevations = np.fromiter((e.story_elevation for e in story_entities), dtype=np.float64, count=count)
+    order = np.lexsort((sequence_orders, bottom_elevations, story_indices, story_elevations))
+    return [story_entities[i] for i in order]
+
 def create_fs_relationships(ifc_file, tasks):
     for i in range(len(tasks) - 1):
         predecessor = tasks[i]
@@ -76,14 +113,14 @@ def create_fs_relationships(ifc_file, tasks):
 
 # Load the IFC file
 ifc_file_path = r'Model\Test_1_Task+cost_linked.ifc'
-ifc_file = ifcopenshell.open(ifc_file_path)
+ifc_file = open_model(ifc_file_path)
 
 # Extract all building stories and their elements
+stories = ifc_file.by_type('IfcBuildingStorey')
 story_entities = []
 
-for story in ifc_file.by_type('IfcBuildingStorey'):
+for story_index, story in enumerate(stories):
     story_elevation = story.Elevation if hasattr(story, 'Elevation') else 0
-    contained_entities = []
     for rel in ifc_file.by_type('IfcRelContainedInSpatialStructure'):
         if rel.RelatingStructure == story:
             for entity in rel.RelatedElements:
@@ -101,80 +138,88 @@ for story in ifc_file.by_type('IfcBuildingStorey'):
                     print(f"Tasks for Entity '{entity.Name}': {task.Name}")
                     print(f"  Cost Items: {', '.join(cost_item_names) if cost_item_names else 'None'}")
                     
-                    contained_entities.append({
-                        'StoryName': story.Name,
-                        'StoryGUID': story.GlobalId,
-                        'StoryElevation': story_elevation,
-                        'EntityName': entity.Name,
-                        'EntityGUID': entity.GlobalId,
-                        'EntityType': entity.is_a(),
-                        'BottomElevation': combined_bottom_elevation,
-                        'TopElevation': combined_bottom_elevation + (elevation['Top Elevation'] - elevation['Bottom Elevation']),
-                        'SequenceOrder': map_element_to_sequence(entity.is_a()),
-                        'Task': task,
-                        'TaskName': task.Name,
-                        'CostItems': cost_items
-                    })
-    contained_entities.sort(key=lambda x: (x['BottomElevation'], x['SequenceOrder']))
-    story_entities.extend(contained_entities)
-
-# Sort stories by their elevation
-story_entities.sort(key=lambda x: x['StoryElevation'])
+                    story_entities.append(StoryEntity(
+                        story_index=story_index,
+                        story_elevation=story_elevation,
+                        entity_id=entity.id(),
+                        entity_guid=sys.intern(entity.GlobalId),
+                        task_id=task.id(),
+                        bottom_elevation=combined_bottom_elevation,
+                        top_elevation=combined_bottom_elevation + (elevation['Top Elevation'] - elevation['Bottom Elevation']),
+                        sequence_order=map_element_to_sequence(entity.is_a()),
+                        cost_item_ids=tuple(cost_item.id() for cost_item in cost_items)
+                    ))
+
+# Sort stories by their elevation, and elements within each story by elevation and sequence
+story_entities = sort_story_entities(story_entities)
 
 # Assign FS relationships
-all_tasks = [entity['Task'] for entity in story_entities]
+all_tasks = [ifc_file.by_id(entity.task_id) for entity in story_entities]
 create_fs_relationships(ifc_file, all_tasks)
 
-# Initialize schedule start time
-current_time = datetime.datetime.now()
-
-# Calculate task times and create/update IfcTaskTime entities
-for entity in story_entities:
-    task = entity['Task']
-    cost_items = entity['CostItems']
-    task_time_hours = calculate_task_time(task, cost_items)
-    entity['EstimatedTaskTime'] = task_time_hours
+# Calculate task times
+task_hours = np.zeros(len(story_entities))
+for index, entity in enumerate(story_entities):
+    task = ifc_file.by_id(entity.task_id)
+    cost_items = [ifc_file.by_id(cost_item_id) for cost_item_id in entity.cost_item_ids]
+    task_hours[index] = entity.estimated_task_time = calculate_task_time(task, cost_items)
+    print(f"Estimated Task Time for '{task.Name}': {entity.estimated_task_time:.2f} hours")
+
+# Scheduled durations in whole minutes. Tasks without an estimate (no cost items, or not one
+# of the productivity-rated trades) are given one hour, and the same duration is used for
+# ScheduleDuration and for ScheduleFinish.
+scheduled_minutes = np.where(task_hours > 0, np.maximum(np.round(task_hours * 60), 1), 60).astype(np.int64)
+scheduled_hours = scheduled_minutes / 60
+
+# Tasks run back to back, so each task starts after the working hours of all previous tasks,
+# and finishes its own duration after that start. All dates are computed at once on the work calendar.
+project_start = np.datetime64(datetime.datetime.now(), 's')
+start_dates = site_calendar.add_working_hours(project_start, np.cumsum(scheduled_hours) - scheduled_hours, snap_to_start=True)
+schedule_starts = to_iso_strings(start_dates)
+schedule_finishes = to_iso_strings(site_calendar.add_working_hours(start_dates, scheduled_hours))
+schedule_durations = [f'PT{minutes // 60}H{minutes % 60}M' if minutes % 60 else f'PT{minutes // 60}H' for minutes in scheduled_minutes]
+
+# Write the work calendar and assign it to the scheduled tasks
+site_calendar.write_to_ifc(ifc_file, list({task.id(): task for task in all_tasks}.values()))
+
+# Create/update IfcTaskTime entities
+for entity, schedule_start, schedule_finish, schedule_duration in zip(story_entities, schedule_starts, schedule_finishes, schedule_durations):
+    task = ifc_file.by_id(entity.task_id)
     
     # Create or update IfcTaskTime entity
     task_time_entity = ifcopenshell.api.run("sequence.add_task_time", ifc_file, task=task, is_recurring=False)
-    schedule_start = current_time.isoformat()
-    schedule_duration = f'PT{int(task_time_hours)}H' if task_time_hours > 0 else 'PT1H'
     
     ifcopenshell.api.run("sequence.edit_task_time", ifc_file, task_time=task_time_entity, attributes={
         "ScheduleStart": schedule_start,
+        "ScheduleFinish": schedule_finish,
         "ScheduleDuration": schedule_duration
     })
     
-    # Calculate finish time
-    schedule_finish = (current_time + datetime.timedelta(hours=task_time_hours)).isoformat()
-    
-    entity['ScheduleStart'] = schedule_start
-    entity['ScheduleFinish'] = schedule_finish
-    entity['ScheduleDuration'] = schedule_duration
-    
-    # Update current_time to the finish time of the current task
-    current_time += datetime.timedelta(hours=task_time_hours)
-    
-    print(f"  Estimated Task Time: {task_time_hours:.2f} hours")
-
-# Create a DataFrame to store the data
-simplified_df = pd.DataFrame([
-    {
-        'Element_GlobalId': entity['EntityGUID'],
-        'Element_Name': entity['EntityName'],
-        'Element_Type': entity['EntityType'],
-        'Building_Story_GlobalId': entity['StoryGUID'],
-        'Building_Story_Name': entity['StoryName'],
-        'Task_Id': entity['Task'].GlobalId,
-        'Task_Name': entity['TaskName'],
-        'ScheduledStart': entity['ScheduleStart'],
-        'ScheduledFinish': entity['ScheduleFinish'],
-        'ScheduleDuration': entity['ScheduleDuration'],
-        'ActualStart': entity['Task'].ActualStart if hasattr(entity['Task'], 'ActualStart') else None,
-        'ActualFinish': entity['Task'].ActualFinish if hasattr(entity['Task'], 'ActualFinish') else None
+    entity.schedule_start = schedule_start
+    entity.schedule_finish = schedule_finish
+    entity.schedule_duration = schedule_duration
+
+# Create a DataFrame to store the data, resolving names from the model by entity id
+def story_entity_row(entity):
+    element = ifc_file.by_id(entity.entity_id)
+    story = stories[entity.story_index]
+    task = ifc_file.by_id(entity.task_id)
+    return {
+        'Element_GlobalId': entity.entity_guid,
+        'Element_Name': element.Name,
+        'Element_Type': element.is_a(),
+        'Building_Story_GlobalId': story.GlobalId,
+        'Building_Story_Name': story.Name,
+        'Task_Id': task.GlobalId,
+        'Task_Name': task.Name,
+        'ScheduledStart': entity.schedule_start,
+        'ScheduledFinish': entity.schedule_finish,
+        'ScheduleDuration': entity.schedule_duration,
+        'ActualStart': task.ActualStart if hasattr(task, 'ActualStart') else None,
+        'ActualFinish': task.ActualFinish if hasattr(task, 'ActualFinish') else None
     }
-    for entity in story_entities
-])
+
+simplified_df = pd.DataFrame([story_entity_row(entity) for entity in story_entities])
 
 # Display the DataFrame
 print(simplified_df)
@@ -186,6 +231,5 @@ simplified_df.to_csv(csv_file_path, index=False)
 print(f"DataFrame exported to {csv_file_path}")
 
 # Save the modified IFC file
-ifc_file.write(r'Model\Test_1_Task+cost_linked_with_tasktime.ifc')
-
-print(f"IFC file saved to 'Test_1_Task+cost_linked_with_tasktime.ifc'")
+if write_model(ifc_file, r'Model\Test_1_Task+cost_linked_with_tasktime.ifc'):
+    print(f"IFC file saved to 'Test_1_Task+cost_linked_with_tasktime.ifc'")
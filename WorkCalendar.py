@@ -0,0 +1,190 @@
+import datetime
+import numpy as np
+import ifcopenshell.api
+
+SECONDS_PER_HOUR = 3600
+
+class WorkCalendar:
+    """
+    Working-time calendar made of daily shifts, working weekdays and holidays.
+
+    The shifts and holidays are compiled once into NumPy lookup arrays and a
+    numpy.busdaycalendar, so date and duration conversions run on whole arrays of tasks.
+
+    Args:
+    - shifts (list): (start_hour, end_hour) pairs of each working day, e.g. [(8, 12), (13, 17)].
+    - weekmask (str): Seven characters for Monday..Sunday, '1' for working days.
+    - holidays (list): Non-working dates (datetime.date, or 'YYYY-MM-DD' strings).
+    - name (str): Name of the IfcWorkCalendar written by write_to_ifc.
+    """
+
+    def __init__(self, shifts=((8, 12), (13, 17)), weekmask="1111100", holidays=(), name="Standard Calendar"):
+        self.name = name
+        self.shifts = tuple(sorted((float(start), float(end)) for start, end in shifts))
+        self.weekmask = weekmask
+        self.holidays = np.array(sorted(holidays), dtype="datetime64[D]")
+        self.busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+
+        if not self.shifts or any(start >= end for start, end in self.shifts):
+            raise ValueError(f"Invalid shifts: {shifts}")
+        if any(prev[1] > curr[0] for prev, curr in zip(self.shifts, self.shifts[1:])):
+            raise ValueError(f"Overlapping shifts: {shifts}")
+
+        # Shift boundaries in seconds since midnight, and working seconds elapsed at each boundary
+        self.shift_starts = np.array([start for start, _ in self.shifts]) * SECONDS_PER_HOUR
+        self.shift_ends = np.array([end for _, end in self.shifts]) * SECONDS_PER_HOUR
+        self.shift_lengths = self.shift_ends - self.shift_starts
+        self.worked_at_shift_end = np.cumsum(self.shift_lengths)
+        self.worked_at_shift_start = self.worked_at_shift_end - self.shift_lengths
+        self.seconds_per_day = self.worked_at_shift_end[-1]
+        self.hours_per_day = self.seconds_per_day / SECONDS_PER_HOUR
+
+    def worked_seconds_in_day(self, seconds_of_day):
+        # Working seconds between midnight and each time of day
+        elapsed = seconds_of_day[:, None] - self.shift_starts[None, :]
+        return np.clip(elapsed, 0, self.shift_lengths[None, :]).sum(axis=1)
+
+    def time_of_day_after(self, worked_seconds, at_start):
+        # Inverse of worked_seconds_in_day. At a shift boundary a start moves on to the
+        # next shift, while a finish stays at the end of the previous one.
+        side = "right" if at_start else "left"
+        shift = np.searchsorted(self.worked_at_shift_end, worked_seconds, side=side)
+        shift = np.minimum(shift, len(self.shifts) - 1)
+        return self.shift_starts[shift] + (worked_seconds - self.worked_at_shift_start[shift])
+
+    def add_working_hours(self, dates, hours, snap_to_start=False):
+        """
+        Move each date forward by a number of working hours.
+
+        Args:
+        - dates (array-like): Start dates, broadcast against hours.
+        - hours (array-like): Non-negative working hours to add.
+        - snap_to_start (bool): Return the next working moment when the result falls on the
+          end of a shift (use for task starts), instead of the shift end (use for finishes).
+
+        Returns:
+        - numpy.ndarray: datetime64[s] results, NaT where the date or hours are missing.
+        """
+        dates, hours = np.broadcast_arrays(np.asarray(dates, dtype="datetime64[s]"), np.asarray(hours, dtype=np.float64))
+        result = np.full(dates.shape, np.datetime64("NaT"), dtype="datetime64[s]")
+        valid = ~np.isnat(dates) & ~np.isnan(hours)
+        dates, hours = dates[valid], hours[valid]
+
+        # Dates on a non-working day roll to the start of the next working day
+        days = np.busday_offset(dates.astype("datetime64[D]"), 0, roll="forward", busdaycal=self.busdaycal)
+        seconds_of_day = (dates - days.astype("datetime64[s]")).astype(np.int64)
+        worked = self.worked_seconds_in_day(seconds_of_day) + hours * SECONDS_PER_HOUR
+
+        if snap_to_start:
+            day_offsets = np.floor(worked / self.seconds_per_day)
+        else:
+            day_offsets = np.maximum(np.ceil(worked / self.seconds_per_day) - 1, 0)
+        remaining = worked - day_offsets * self.seconds_per_day
+
+        finish_days = np.busday_offset(days, day_offsets.astype(np.int64), roll="forward", busdaycal=self.busdaycal)
+        time_of_day = self.time_of_day_after(remaining, snap_to_start)
+        result[valid] = finish_days.astype("datetime64[s]") + np.round(time_of_day).astype("timedelta64[s]")
+        return result
+
+    def working_hours_between(self, starts, finishes):
+        """
+        Count the working hours between pairs of dates.
+
+        Args:
+        - starts (array-like): Start dates.
+        - finishes (array-like): Finish dates, broadcast against starts.
+
+        Returns:
+        - numpy.ndarray: Working hours, negative when a finish is before its start and
+          NaN where either date is missing.
+        """
+        starts, finishes = np.broadcast_arrays(np.asarray(starts, dtype="datetime64[s]"), np.asarray(finishes, dtype="datetime64[s]"))
+        result = np.full(starts.shape, np.nan)
+        valid = ~np.isnat(starts) & ~np.isnat(finishes)
+        starts, finishes = starts[valid], finishes[valid]
+
+        start_days = starts.astype("datetime64[D]")
+        finish_days = finishes.astype("datetime64[D]")
+        worked_days = np.busday_count(start_days, finish_days, busdaycal=self.busdaycal)
+        worked_before_start = np.where(
+            np.is_busday(start_days, busdaycal=self.busdaycal),
+            self.worked_seconds_in_day((starts - start_days.astype("datetime64[s]")).astype(np.int64)), 0)
+        worked_before_finish = np.where(
+            np.is_busday(finish_days, busdaycal=self.busdaycal),
+            self.worked_seconds_in_day((finishes - finish_days.astype("datetime64[s]")).astype(np.int64)), 0)
+        result[valid] = (worked_days * self.seconds_per_day + worked_before_finish - worked_before_start) / SECONDS_PER_HOUR
+        return result
+
+    def working_days_between(self, starts, finishes):
+        # Working hours expressed in full working days of this calendar
+        return self.working_hours_between(starts, finishes) / self.hours_per_day
+
+    def write_to_ifc(self, ifc_file, tasks=()):
+        """
+        Write the calendar as an IfcWorkCalendar and assign it to tasks.
+
+        Args:
+        - ifc_file (ifcopenshell.file): The IFC file to modify.
+        - tasks (list): IfcTask entities scheduled with this calendar.
+
+        Returns:
+        - ifcopenshell.entity_instance: The created IfcWorkCalendar.
+        """
+        calendar = ifcopenshell.api.run("sequence.add_work_calendar", ifc_file, name=self.name)
+
+        # Weekly working times, one time period per shift (IFC weekdays are 1 = Monday .. 7 = Sunday)
+        work_time = ifcopenshell.api.run("sequence.add_work_time", ifc_file, work_calendar=calendar, time_type="WorkingTimes")
+        ifcopenshell.api.run("sequence.edit_work_time", ifc_file, work_time=work_time, attributes={"Name": "Shifts"})
+        pattern = ifcopenshell.api.run("sequence.assign_recurrence_pattern", ifc_file, parent=work_time, recurrence_type="WEEKLY")
+        weekdays = [day + 1 for day, working in enumerate(self.weekmask) if working == "1"]
+        ifcopenshell.api.run("sequence.edit_recurrence_pattern", ifc_file, recurrence_pattern=pattern, attributes={"WeekdayComponent": weekdays})
+        for start, end in self.shifts:
+            ifcopenshell.api.run("sequence.add_time_period", ifc_file, recurrence_pattern=pattern,
+                                 start_time=hours_to_time(start), end_time=hours_to_time(end))
+
+        # Holidays as single-day exception times
+        for holiday in self.holidays.astype(object):
+            exception = ifcopenshell.api.run("sequence.add_work_time", ifc_file, work_calendar=calendar, time_type="ExceptionTimes")
+            # IfcWorkTime.Start/Finish were renamed StartDate/FinishDate in IFC4X3
+            if ifc_file.schema == "IFC4":
+                attributes = {"Name": "Holiday", "Start": holiday, "Finish": holiday}
+            else:
+                attributes = {"Name": "Holiday", "StartDate": holiday, "FinishDate": holiday}
+            ifcopenshell.api.run("sequence.edit_work_time", ifc_file, work_time=exception, attributes=attributes)
+
+        for task in tasks:
+            ifcopenshell.api.run("control.assign_control", ifc_file, relating_control=calendar, related_object=task)
+
+        print(f"Work calendar '{self.name}' written with {len(self.shifts)} shifts and {len(self.holidays)} holidays")
+        return calendar
+
+# Site work calendar shared by sequencing (Taskhierachy.py) and actuals (5.UpdateActuals.py),
+# so completion is measured on the same working time the schedule was built with.
+# Two shifts on weekdays; add public holidays as 'YYYY-MM-DD' dates.
+site_calendar = WorkCalendar(
+    shifts=[(8, 12), (13, 17)],
+    weekmask="1111100",
+    holidays=[]
+)
+
+def hours_to_time(hours):
+    # Convert fractional hours since midnight to a datetime.time
+    seconds = int(round(hours * SECONDS_PER_HOUR))
+    if seconds >= 24 * SECONDS_PER_HOUR:
+        return datetime.time(23, 59, 59)
+    return datetime.time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+def to_iso_strings(dates):
+    # ISO 8601 strings for an array of datetime64 values, None where missing
+    return [None if np.isnat(date) else str(date) for date in np.asarray(dates, dtype="datetime64[s]")]
+
+# Smoke check: write a calendar with a holiday into new IFC4 and IFC4X3 projects
+if __name__ == "__main__":
+    import ifcopenshell
+    calendar_with_holiday = WorkCalendar(shifts=site_calendar.shifts, weekmask=site_calendar.weekmask, holidays=["2026-12-25"])
+    for schema in ("IFC4", "IFC4X3"):
+        ifc_file = ifcopenshell.file(schema=schema)
+        ifcopenshell.api.run("root.create_entity", ifc_file, ifc_class="IfcProject")
+        calendar_with_holiday.write_to_ifc(ifc_file)
+        for work_time in ifc_file.by_type("IfcWorkTime"):
+            print(schema, work_time.get_info(recursive=False))